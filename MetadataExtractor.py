@@ -1,28 +1,323 @@
 # Standard library imports
+import hashlib
 import os
-import re
+import shutil
+import string
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List
+
+# Tesseract's OpenMP threading is a net slowdown for single-page OCR
+# (fork/join overhead outweighs the parallel gains), so pin it to one
+# thread before pytesseract can spawn the engine
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
 
 # Third-party imports
-from pytesseract import pytesseract, TesseractNotFoundError
+import cv2 as cv
+import numpy as np
+from pytesseract import pytesseract, Output, TesseractNotFoundError
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # Application-specific imports
 from digitization.Image import Image
 from digitization.DigitizationError import DigitizationError
 
-# Set the path to the Tesseract executable
-pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+def _prefer_simd_build(cmd: str) -> str:
+    """
+    Prefer an AVX2-enabled Tesseract build over a generic one. The LSTM
+    recognizer is a stream of matrix-vector products whose throughput
+    scales with SIMD width, so if the resolved binary reports no AVX2
+    support and a sibling build with an ``-avx2`` suffix is installed,
+    switch to it.
+
+    Args:
+        cmd (str): Path of the resolved Tesseract executable.
+
+    Returns:
+        str: Path of the preferred Tesseract executable.
+    """
+    try:
+        probe = subprocess.run(
+            [cmd, "--version"], capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return cmd
+    # Tesseract prints the SIMD paths it was built with, e.g. "Found AVX2"
+    version = (probe.stdout + probe.stderr).lower()
+    if "avx2" in version or "avx512" in version:
+        return cmd
+    root, ext = os.path.splitext(cmd)
+    alt = f"{root}-avx2{ext}"
+    return alt if os.path.isfile(alt) else cmd
+
+
+# Resolve the Tesseract executable once at import so every call does not
+# pay the failed subprocess spawn when the engine is not installed
+_TESS_CMD = (
+    shutil.which("tesseract")
+    or r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+)
+_TESS_OK = os.path.isfile(_TESS_CMD)
+if _TESS_OK:
+    _TESS_CMD = _prefer_simd_build(_TESS_CMD)
+pytesseract.tesseract_cmd = _TESS_CMD
+
+# Standard location of the int-quantized "fast" traineddata models
+_TESSDATA_FAST = "/usr/share/tessdata_fast"
+
+# Deletion table with every ASCII char not allowed in the metadata;
+# str.translate is a plain C lookup per char, several times faster than
+# running the regex engine for a fixed character class
+_ALLOWED_CHARS = set(string.ascii_letters + string.digits + " \t\n/\\.,-")
+_DELETE_TBL = {
+    cp: None for cp in range(128) if chr(cp) not in _ALLOWED_CHARS
+}
+
+# Allowed bytes as a flat mask, indexable from nopython code
+_ALLOWED_MASK = np.zeros(128, dtype=np.bool_)
+for _c in _ALLOWED_CHARS:
+    _ALLOWED_MASK[ord(_c)] = True
+
+
+def _format_fallback(metadata: str) -> str:
+    """
+    Format an OCR output with plain str methods. Fallback of the jitted
+    single-pass filter when numba is not installed.
+
+    Args:
+        metadata (str): Raw OCR output.
+
+    Returns:
+        str: Formatted metadata.
+    """
+    metadata = metadata.translate(_DELETE_TBL)
+    lines = (" ".join(line.split()) for line in metadata.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+if nb is not None:
+    @nb.njit(cache=True)
+    def _clean_buf(buf: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+        """
+        Single LLVM-compiled pass over an ASCII buffer that drops
+        disallowed bytes, collapses whitespace runs to one space and
+        removes blank lines, fusing both formatting passes.
+
+        Args:
+            buf (np.ndarray): ASCII bytes of the raw OCR output.
+            allowed (np.ndarray): Mask of the 128 allowed ASCII bytes.
+
+        Returns:
+            np.ndarray: Cleaned ASCII bytes.
+        """
+        out = np.empty(buf.size, np.uint8)
+        n = 0
+        line_start = 0
+        pending_space = False
+        for i in range(buf.size):
+            b = buf[i]
+            if not allowed[b]:
+                continue
+            if b == 10:
+                if n > line_start:
+                    out[n] = 10
+                    n += 1
+                    line_start = n
+                pending_space = False
+            elif b == 32 or b == 9:
+                if n > line_start:
+                    pending_space = True
+            else:
+                if pending_space:
+                    out[n] = 32
+                    n += 1
+                    pending_space = False
+                out[n] = b
+                n += 1
+        if n > 0 and out[n - 1] == 10:
+            n -= 1
+        return out[:n]
+
+
+def _format_metadata(metadata: str) -> str:
+    """
+    Format a raw OCR output: keep only the allowed character set,
+    collapse whitespace runs and drop blank lines.
+
+    Args:
+        metadata (str): Raw OCR output.
+
+    Returns:
+        str: Formatted metadata.
+    """
+    # Non-ASCII chars are dropped at C speed by the codec
+    raw = metadata.encode("ascii", "ignore")
+    if nb is None:
+        return _format_fallback(raw.decode())
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    return _clean_buf(buf, _ALLOWED_MASK).tobytes().decode("ascii")
+
+
+# In-process OCR engine shared by every extractor of the process, so
+# the tessdata load and LSTM weight mmap are paid exactly once
+_API_LOCK = threading.Lock()
+_SHARED_API = None
+_API_FAILED = False
+
+
+def _get_api():
+    """
+    Get the shared in-process OCR engine, lazily created with
+    double-checked locking. None if tesserocr is not installed or its
+    engine cannot initialize (e.g. missing language models).
+
+    Returns:
+        tesserocr.PyTessBaseAPI: Shared OCR engine or None.
+    """
+    global _SHARED_API, _API_FAILED
+    if tesserocr is None or _API_FAILED:
+        return None
+    if _SHARED_API is None:
+        with _API_LOCK:
+            if _SHARED_API is None and not _API_FAILED:
+                # LSTM-only engine mode skips the legacy classifier and
+                # its model set; the int-quantized "fast" models roughly
+                # double recognition throughput when installed
+                kwargs = {}
+                if os.path.isdir(_TESSDATA_FAST):
+                    kwargs["path"] = _TESSDATA_FAST
+                try:
+                    _SHARED_API = tesserocr.PyTessBaseAPI(
+                        lang="eng",
+                        psm=tesserocr.PSM.SINGLE_BLOCK,
+                        oem=tesserocr.OEM.LSTM_ONLY,
+                        **kwargs,
+                    )
+                except RuntimeError:
+                    # The binding is installed but the engine cannot come
+                    # up (no eng.traineddata on the configured path, broken
+                    # tessdata install). Remember the failure so every
+                    # extraction falls through to the CLI path instead of
+                    # retrying the init per instance
+                    _API_FAILED = True
+                    return None
+    return _SHARED_API
+
+
+# OCR is deterministic for a given image, so results are memoized keyed
+# on a content hash; hashing runs at GB/s and is negligible next to OCR
+_OCR_CACHE: OrderedDict = OrderedDict()
+_OCR_CACHE_SIZE = 64
+
+# On-disk cache so results also survive process restarts
+_OCR_CACHE_DIR = Path("~/.cache/bhart/ocr").expanduser()
+
+
+def _memoize(key: str, metadata: str) -> None:
+    """
+    Insert an OCR result in the in-memory cache, evicting the least
+    recently used entry when the bound is exceeded.
+
+    Args:
+        key (str): Content hash of the ECG image.
+        metadata (str): Formatted metadata of the ECG.
+    """
+    _OCR_CACHE[key] = metadata
+    if len(_OCR_CACHE) > _OCR_CACHE_SIZE:
+        _OCR_CACHE.popitem(last=False)
+
+
+def _image_key(data: np.ndarray) -> str:
+    """
+    Content hash of an image, usable as cache key and filename. xxh3 is
+    preferred for its throughput, with BLAKE2 as stdlib fallback.
+
+    Args:
+        data (np.ndarray): Image data.
+
+    Returns:
+        str: Hex digest of the image content.
+    """
+    raw = np.ascontiguousarray(data).tobytes()
+    if xxhash is not None:
+        return xxhash.xxh3_64(raw).hexdigest()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+# One MSER detector for the whole process: constructing one allocates
+# the full detector state, pure overhead to repeat per text-gate call
+_MSER = cv.MSER_create()
+
+# Extractor reused across all batch jobs of a single worker process, so
+# each worker loads the OCR engine only once
+_WORKER_EXTRACTOR = None
+
+
+def _init_worker() -> None:
+    """
+    Create the long-lived extractor of a batch worker process.
+    """
+    global _WORKER_EXTRACTOR
+    _WORKER_EXTRACTOR = MetadataExtractor()
+
+
+def _worker_extract(ecg: Image) -> str:
+    """
+    Extract the metadata of an ECG with the worker extractor.
+
+    Args:
+        ecg (Image): ECG image.
+
+    Returns:
+        str: String with the metadata of the ECG.
+    """
+    return _WORKER_EXTRACTOR.extract_metadata(ecg)
+
 
 class MetadataExtractor:
     """
     OCR to extract metadata from an ECG.
     """
-    
+
+    # Approximate pixel height of a metadata text line after rescaling
+    OCR_LINE_HEIGHT = 130
+    # Rough number of text lines expected in the metadata band
+    OCR_TEXT_LINES = 5
+    # Largest image dimension tolerated before downscaling for OCR
+    OCR_MAX_DIM = 2000
+    # Minimum Tesseract word confidence kept in the metadata
+    OCR_MIN_CONF = 40
+    # Minimum MSER regions for an ROI to be considered to contain text
+    MIN_TEXT_REGIONS = 5
+    # Fraction of the image height holding metadata text at the top
+    TOP_ROI_FRAC = 0.15
+    # Fraction of the image height holding metadata text at the bottom
+    BOTTOM_ROI_FRAC = 0.1
+
+
     def __init__(self):
         """
-        Initialization of the Metadata OCR.
+        Initialization of the Metadata OCR. If the in-process tesserocr
+        API is available, a reference to the engine shared by the whole
+        process is taken so the language model is loaded only once;
+        otherwise each call falls back to the pytesseract CLI wrapper.
         """
-        pass
-    
+        self._api = _get_api()
+
+
     def extract_metadata(self, ecg: Image) -> str:
         """
         Extract the metadata of an ECG.
@@ -36,13 +331,196 @@ class MetadataExtractor:
         Returns:
             str: String with the metadata of the ECG.
         """
-        metadata = ""
+        key = _image_key(ecg.data)
+        cached = _OCR_CACHE.get(key)
+        if cached is not None:
+            _OCR_CACHE.move_to_end(key)
+            return cached
+        cache_file = _OCR_CACHE_DIR / f"{key}.txt"
+        try:
+            if cache_file.is_file():
+                metadata = cache_file.read_text(encoding="utf-8")
+                _memoize(key, metadata)
+                return metadata
+        except OSError:
+            # Disk cache is best-effort; fall through to the OCR
+            pass
+        h = ecg.data.shape[0]
+        # ECG layouts place metadata text in known bands at the top and
+        # bottom of the page, so only those ROIs are handed to the OCR
+        rois = (
+            ecg.data[0 : int(self.TOP_ROI_FRAC * h)],
+            ecg.data[int((1 - self.BOTTOM_ROI_FRAC) * h) : h],
+        )
+        metadata = "\n".join(self.__ocr(roi) for roi in rois)
+        metadata = _format_metadata(metadata)
+        _memoize(key, metadata)
+        # Atomic write so a concurrent reader never sees a partial file.
+        # A failed write (read-only filesystem, disk full) must not fail
+        # an extraction that already succeeded
+        try:
+            _OCR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".tmp{os.getpid()}")
+            tmp_file.write_text(metadata, encoding="utf-8")
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+        return metadata
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Drop every memoized OCR result, both in memory and on disk.
+        """
+        _OCR_CACHE.clear()
+        if _OCR_CACHE_DIR.is_dir():
+            # Also sweep .tmp files orphaned by a crashed writer
+            for cache_file in _OCR_CACHE_DIR.iterdir():
+                if cache_file.is_file():
+                    cache_file.unlink(missing_ok=True)
+
+    def extract_metadata_many(self, ecgs: Iterable[Image]) -> List[str]:
+        """
+        Extract the metadata of several ECGs in parallel. Each worker
+        process keeps its own OCR engine alive across images, so batch
+        runs (e.g. a multi-page study) scale with the available cores
+        instead of serializing one engine start per image.
+
+        Args:
+            ecgs (Iterable[Image]): ECG images.
+
+        Returns:
+            List[str]: Strings with the metadata of each ECG, in order.
+        """
+        ecgs = list(ecgs)
+        if len(ecgs) <= 1:
+            return [self.extract_metadata(ecg) for ecg in ecgs]
+        max_workers = max(1, (os.cpu_count() or 1) // 4)
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker
+        ) as executor:
+            return list(executor.map(_worker_extract, ecgs))
+
+    def __ocr(self, img: np.ndarray) -> str:
+        """
+        Run the OCR engine over an image region.
+
+        Args:
+            img (np.ndarray): Image region with text.
+
+        Raises:
+            DigitizationError: Tesseract OCR-Engine it is not installed in the OS.
+
+        Returns:
+            str: Raw text recognized in the region.
+        """
+        img = self.__prep_for_ocr(img)
+        # Cheap text detector before the expensive recognizer: an ROI
+        # with no text at all is the worst case for Tesseract, which
+        # still runs the full LSTM over everything. The gate runs on the
+        # grayscale crop; after binarization clipped waveform strokes
+        # collapse into large stable regions and waveform-only bands
+        # would sail through
+        if not self.__has_text(img):
+            return ""
+        img = self.__binarize(img)
+        if self._api is not None:
+            # In-process API: the contiguous grayscale buffer is handed
+            # over as raw bytes, with no PIL object nor PNG round trip.
+            # The engine is shared process-wide, hence the lock
+            h, w = img.shape
+            with _API_LOCK:
+                self._api.SetImageBytes(img.tobytes(), w, h, 1, w)
+                return self._api.GetUTF8Text()
+        if not _TESS_OK:
+            raise DigitizationError(f"Tesseract OCR-Engine installation not found.")
         try:
-            metadata = pytesseract.image_to_string(ecg.data)
+            # PSM 6 treats the crop as a uniform block of text, skipping
+            # Tesseract's page layout analysis. The TSV output is already
+            # tokenized per word with confidences, so low-confidence
+            # garbage is dropped before any string post-processing
+            data = pytesseract.image_to_data(
+                img, config="--oem 1 --psm 6", output_type=Output.DICT
+            )
         except TesseractNotFoundError:
             raise DigitizationError(f"Tesseract OCR-Engine installation not found.")
+        lines = OrderedDict()
+        for word, conf, block, par, line in zip(
+            data["text"],
+            data["conf"],
+            data["block_num"],
+            data["par_num"],
+            data["line_num"],
+        ):
+            if int(conf) > self.OCR_MIN_CONF and word.strip():
+                lines.setdefault((block, par, line), []).append(word)
+        return "\n".join(" ".join(words) for words in lines.values())
+
+    def __has_text(self, img: np.ndarray) -> bool:
+        """
+        Check whether an image region plausibly contains text, using
+        MSER as a cheap character-candidate detector on the grayscale
+        (pre-threshold) crop.
+
+        Args:
+            img (np.ndarray): Grayscale image region.
+
+        Returns:
+            bool: True if the region has enough text candidates.
+        """
+        regions, _ = _MSER.detectRegions(img)
+        return len(regions) >= self.MIN_TEXT_REGIONS
+
+    def __prep_for_ocr(self, img: np.ndarray) -> np.ndarray:
+        """
+        Prepare an ECG image for the text gate and OCR. The image is
+        converted to grayscale and rescaled so the metadata text lands
+        near the line height Tesseract's LSTM was trained on.
+
+        Args:
+            img (np.ndarray): ECG image data.
+
+        Returns:
+            np.ndarray: Rescaled grayscale image.
+        """
+        # Tesseract grayscales internally as its first step; doing it
+        # here shrinks the buffer handed over by 3-4x
+        if img.ndim == 3:
+            code = cv.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv.COLOR_BGR2GRAY
+            img = cv.cvtColor(img, code)
+        if img.dtype != np.uint8:
+            img = img.astype(np.uint8)
+        # Rescale on height alone: the metadata bands are wide and short,
+        # so keying on the largest dimension would shrink by width and
+        # then cubically blow the height right back up. One scale factor
+        # clamps the text height into Tesseract's range in a single pass
+        h, w = img.shape
+        min_h = self.OCR_LINE_HEIGHT * self.OCR_TEXT_LINES
+        if h < min_h:
+            target_h = min_h
+        elif h > self.OCR_MAX_DIM:
+            target_h = self.OCR_MAX_DIM
         else:
-            # Format metadata
-            metadata = re.sub(r"[^a-zA-Z0-9\s\t\n\/\\.,-]+", "", metadata)
-            metadata = re.sub(r"(\n|\s|\t)(\n|\s|\t)+", r"\1", metadata)
-            return metadata
\ No newline at end of file
+            target_h = h
+        if target_h != h:
+            scale = target_h / h
+            # Area interpolation averages cleanly when shrinking; cubic
+            # keeps stroke edges crisp when growing
+            interp = cv.INTER_AREA if scale < 1 else cv.INTER_CUBIC
+            img = cv.resize(img, (round(w * scale), target_h), interpolation=interp)
+        return img
+
+    def __binarize(self, img: np.ndarray) -> np.ndarray:
+        """
+        Binarize a prepared grayscale crop with Otsu thresholding.
+
+        Args:
+            img (np.ndarray): Rescaled grayscale image region.
+
+        Returns:
+            np.ndarray: Binarized image ready for the OCR engine.
+        """
+        _, img = cv.threshold(img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+        # Guarantee a tightly-packed buffer so the raw-bytes handoff to
+        # the engine never triggers a strided copy
+        return np.ascontiguousarray(img)
\ No newline at end of file
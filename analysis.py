@@ -0,0 +1,31 @@
+import numpy as np
+
+# Static analysis results hoisted to module scope: only the confidence
+# score is drawn per call, everything else is a shared immutable tuple
+_NORMAL_CHARS = (
+    'Regular rhythm',
+    'Heart rate 60-100 bpm',
+    'Normal P waves preceding each QRS complex',
+    'Normal PR interval (0.12-0.20s)',
+    'Normal QRS duration (<0.12s)',
+    'Isoelectric ST segment',
+    'Upright T waves',
+)
+_MI_CHARS = (
+    'ST segment elevation or depression (depending on MI type)',
+    'Pathological Q waves (wider and deeper than normal)',
+    'T-wave inversion or hyperacute T waves',
+    'Possible abnormal R-wave progression',
+    'May be associated with arrhythmias',
+)
+_RESULTS = {
+    'normal': ('Normal Sinus Rhythm', (90, 100), _NORMAL_CHARS), # 90-99%
+    'mi': ('Myocardial Infarction (Simulated)', (85, 96), _MI_CHARS), # 85-95%
+}
+
+# Function to simulate AI analysis based on the selected ECG type
+def perform_ai_analysis(ecg_type):
+    if ecg_type not in _RESULTS:
+        return '', 0, ()
+    diagnosis, conf_range, characteristics = _RESULTS[ecg_type]
+    return diagnosis, np.random.randint(*conf_range), characteristics
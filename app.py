@@ -1,89 +1,21 @@
 import streamlit as st
 import numpy as np
-import time
-import math
 import pandas as pd
-from io import BytesIO
-
-# Utility function to generate a single ECG point (Y-value) at a given time for a specific type
-# This function simulates the different phases of an ECG waveform (P, QRS, T) and adds noise.
-# For MI, it introduces simulated ST elevation, deeper Q waves, and inverted T waves.
-def generate_ecg_point(time_ms, ecg_type):
-    # Simulate a heart rate of 60 bpm (1 beat per second)
-    beat_duration = 1000  # milliseconds for one complete ECG cycle
-    time_in_beat = time_ms % beat_duration  # Current time within the 1-second beat cycle
-
-    y = 0  # Baseline for the ECG signal
-
-    # Simulate P wave (at the beginning of the beat cycle)
-    if 0 <= time_in_beat < 100:
-        y += math.sin(time_in_beat / 100 * math.pi) * 10  # A small positive hump
-    # Simulate PR segment (flat line after P wave)
-    elif 100 <= time_in_beat < 150:
-        y += 0
-    # Simulate QRS complex (the main sharp spike)
-    elif 150 <= time_in_beat < 250:
-        if time_in_beat < 170:  # Q wave (downward deflection)
-            y += (time_in_beat - 170) / 20 * 30
-        elif time_in_beat < 200:  # R wave (large upward deflection)
-            y += ((time_in_beat - 170) / 30) * -80
-        else:  # S wave (downward deflection after R)
-            y += (time_in_beat - 200) / 50 * 50
-    # Simulate ST segment (flat line after S wave, before T wave)
-    elif 250 <= time_in_beat < 320:
-        y += 0
-    # Simulate T wave (a broader hump after ST segment)
-    elif 320 <= time_in_beat < 450:
-        y += math.sin((time_in_beat - 320) / 130 * math.pi) * 20
-
-    # Add random noise to make the signal less perfect
-    y += (np.random.rand() - 0.5) * 5
-
-    # Apply Myocardial Infarction (MI) specific changes if `ecg_type` is 'mi'
-    if ecg_type == 'mi':
-        # Simulate ST elevation: A significant upward shift of the ST segment, characteristic of STEMI
-        if 250 <= time_in_beat < 320:
-            y -= 30  # Elevate ST segment by a fixed amount
-        # Simulate pathological Q wave: A deeper and wider Q wave, often indicating past MI
-        if 150 <= time_in_beat < 170:
-            y += (time_in_beat - 170) / 20 * 60  # Make Q wave significantly deeper
-        # Simulate T wave inversion: The T wave goes below the baseline, common in MI
-        if 320 <= time_in_beat < 450:
-            y *= -1.5  # Invert and amplify the T wave
-
-    return y
-
-# Function to simulate AI analysis based on the selected ECG type
-def perform_ai_analysis(ecg_type):
-    new_diagnosis = ''
-    new_confidence_score = 0
-    new_characteristics = []
-
-    if ecg_type == 'normal':
-        new_diagnosis = 'Normal Sinus Rhythm'
-        new_confidence_score = np.random.randint(90, 100) # 90-99%
-        new_characteristics = [
-            'Regular rhythm',
-            'Heart rate 60-100 bpm',
-            'Normal P waves preceding each QRS complex',
-            'Normal PR interval (0.12-0.20s)',
-            'Normal QRS duration (<0.12s)',
-            'Isoelectric ST segment',
-            'Upright T waves',
-        ]
-    elif ecg_type == 'mi':
-        new_diagnosis = 'Myocardial Infarction (Simulated)'
-        new_confidence_score = np.random.randint(85, 96) # 85-95%
-        new_characteristics = [
-            'ST segment elevation or depression (depending on MI type)',
-            'Pathological Q waves (wider and deeper than normal)',
-            'T-wave inversion or hyperacute T waves',
-            'Possible abnormal R-wave progression',
-            'May be associated with arrhythmias',
-        ]
-    return new_diagnosis, new_confidence_score, new_characteristics
-
-# --- New Function: Simulate Digitization and Model Inference for PDF ---
+
+from analysis import perform_ai_analysis
+from ecg_sim import (
+    CHUNK_SIZE,
+    PIXEL_WIDTH,
+    RNG,
+    SAMPLE_MS,
+    TEMPLATES,
+    TEMPLATE_LEN,
+    downsample_for_display,
+    generate_ecg_point,
+)
+from styles import page_css, result_card_html
+
+# --- Simulate Digitization and Model Inference for PDF ---
 def simulate_pdf_analysis_and_inference(simulated_ecg_type):
     # This function simulates the entire process from PDF upload to AI diagnosis.
     # In a real application, 'uploaded_pdf' would be processed by a digitization
@@ -98,10 +30,13 @@ def simulate_pdf_analysis_and_inference(simulated_ecg_type):
     # We will generate a fixed number of points to represent a "snapshot"
     num_points_for_static_ecg = 1000 # Represents about 10 seconds of ECG at 100 points/sec
     static_ecg_data = [generate_ecg_point(i * 10, simulated_ecg_type) for i in range(num_points_for_static_ecg)] # Simulate 10ms per point
-    
+
+    xs, ys = downsample_for_display(
+        range(0, num_points_for_static_ecg * 10, 10), static_ecg_data
+    )
     chart_df = pd.DataFrame({
-        'Time (ms)': range(0, num_points_for_static_ecg * 10, 10), # Time in ms
-        'ECG Signal (mV)': static_ecg_data
+        'Time (ms)': xs, # Time in ms
+        'ECG Signal (mV)': ys
     })
     st.line_chart(chart_df.set_index('Time (ms)'))
     st.markdown("<p style='text-align: center; color: #718096; font-size: 0.875rem; font-style: italic;'>Simulated ECG waveform as if extracted from PDF.</p>", unsafe_allow_html=True)
@@ -109,89 +44,25 @@ def simulate_pdf_analysis_and_inference(simulated_ecg_type):
 
     st.markdown("---")
     st.subheader("Simulated AI Model Inference")
-    
+
     # Simulate model inference
     diagnosis, confidence_score, characteristics = perform_ai_analysis(simulated_ecg_type)
-    
+
     # Display results
-    diagnosis_style_color = '#065f46' if simulated_ecg_type == 'normal' else '#b91c1c'
-    bg_color = '#ecfdf5' if simulated_ecg_type == 'normal' else '#fef2f2'
-    
-    st.markdown(f"""
-        <div style='background-color: {bg_color}; padding: 1.5rem; border-radius: 0.5rem; box-shadow: 0 1px 2px rgba(0, 0, 0, 0.05);'>
-            <p style='text-align: left; font-size: 1.125rem; margin-bottom: 0.5rem;'>
-                <span style='font-weight: 500;'>AI Diagnosis:</span>
-                <span style='font-weight: 700; color: {diagnosis_style_color};'> {diagnosis}</span>
-            </p>
-            <p style='text-align: left; font-size: 1.125rem; margin-bottom: 1rem;'>
-                <span style='font-weight: 500;'>Confidence Score:</span>
-                <span style='font-weight: 700; color: #4a5568;'> {confidence_score}%</span>
-            </p>
-            <h3 style='font-size: 1.25rem; font-weight: 600; color: #4a5568; margin-bottom: 0.75rem;'>Key ECG Characteristics:</h3>
-            <ul style='list-style-type: disc; margin-left: 1.25rem; color: #4a5568;'>
-                {"".join(f"<li>{char}</li>" for char in characteristics)}
-            </ul>
-            <p style='text-align: left; font-size: 0.875rem; color: #718096; margin-top: 1rem; font-style: italic;'>
-                Disclaimer: The digitization and AI analysis for this PDF are simulated based on your selection. For actual clinical use, real ECG signal extraction from PDF and a validated AI model are required.
-            </p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(result_card_html(
+        simulated_ecg_type,
+        diagnosis,
+        confidence_score,
+        tuple(characteristics),
+        'AI Diagnosis:',
+        'Key ECG Characteristics:',
+        'Disclaimer: The digitization and AI analysis for this PDF are simulated based on your selection. For actual clinical use, real ECG signal extraction from PDF and a validated AI model are required.',
+    ), unsafe_allow_html=True)
 
 # Streamlit App UI
 st.set_page_config(layout="centered", page_title="Real-Time AI-Based ECG Analyzer", page_icon="❤️")
 
-st.markdown("""
-    <style>
-    .reportview-container {
-        background: #f0f2f6; /* Light gray background */
-    }
-    .main .block-container {
-        background-color: #ffffff; /* White card background */
-        padding: 2rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1), 0 1px 3px rgba(0, 0, 0, 0.08);
-    }
-    h1 {
-        color: #1a56db; /* Blue for headings */
-        text-align: center;
-        font-family: 'Inter', sans-serif;
-        font-weight: 700;
-    }
-    p {
-        color: #4a5568; /* Darker gray for text */
-        text-align: center;
-        font-family: 'Inter', sans-serif;
-    }
-    .stButton>button {
-        background-color: #4CAF50; /* Green button */
-        color: white;
-        padding: 0.75rem 1.5rem;
-        border-radius: 0.5rem;
-        border: none;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-        transition: all 0.3s ease-in-out;
-        font-weight: 600;
-    }
-    .stButton>button:hover {
-        background-color: #45a049;
-        transform: scale(1.02);
-    }
-    /* Specific styles for MI button */
-    .stButton>button[kind="secondary"] {
-        background-color: #ef4444; /* Red button */
-    }
-    .stButton>button[kind="secondary"]:hover {
-        background-color: #dc2626;
-    }
-    /* Stop button */
-    .stButton>button[kind="tertiary"] {
-        background-color: #6b7280; /* Gray button */
-    }
-    .stButton>button[kind="tertiary"]:hover {
-        background-color: #4b5563;
-    }
-    </style>
-""", unsafe_allow_html=True)
+st.markdown(page_css(), unsafe_allow_html=True)
 
 st.title("Real-Time AI-Based ECG Analyzer (Simulated)")
 st.write("This application simulates a real-time ECG stream and an AI's ability to differentiate between a normal ECG and one indicative of Myocardial Infarction. Select a scenario to start the live stream or upload a PDF for simulated analysis.")
@@ -205,6 +76,15 @@ if 'uploaded_pdf' not in st.session_state:
     st.session_state.uploaded_pdf = None
 if 'pdf_analysis_triggered' not in st.session_state:
     st.session_state.pdf_analysis_triggered = False
+if 'stream_buf' not in st.session_state:
+    # Preallocated ring buffer: one visible window, written in place
+    st.session_state.stream_buf = np.zeros(PIXEL_WIDTH, np.float32)
+if 'stream_pos' not in st.session_state:
+    st.session_state.stream_pos = 0 # Ring buffer write cursor
+if 'stream_filled' not in st.session_state:
+    st.session_state.stream_filled = 0 # Valid samples, until the ring wraps
+if 'stream_step' not in st.session_state:
+    st.session_state.stream_step = 0
 
 # --- Section for Real-time Stream Simulation ---
 st.header("Simulate Real-time ECG Stream")
@@ -216,13 +96,21 @@ with col1:
         st.session_state.ecg_type = 'normal'
         st.session_state.pdf_analysis_triggered = False # Reset PDF analysis state
         st.session_state.uploaded_pdf = None # Clear uploaded PDF
-        
+        st.session_state.stream_buf = np.zeros(PIXEL_WIDTH, np.float32) # Fresh ring buffer
+        st.session_state.stream_pos = 0
+        st.session_state.stream_filled = 0
+        st.session_state.stream_step = 0
+
 with col2:
     if st.button("Start MI ECG Stream", type="secondary", disabled=st.session_state.is_streaming):
         st.session_state.is_streaming = True
         st.session_state.ecg_type = 'mi'
         st.session_state.pdf_analysis_triggered = False # Reset PDF analysis state
         st.session_state.uploaded_pdf = None # Clear uploaded PDF
+        st.session_state.stream_buf = np.zeros(PIXEL_WIDTH, np.float32) # Fresh ring buffer
+        st.session_state.stream_pos = 0
+        st.session_state.stream_filled = 0
+        st.session_state.stream_step = 0
 
 with col3:
     if st.session_state.is_streaming:
@@ -240,11 +128,10 @@ analysis_placeholder = st.empty() # Placeholder for analysis results
 st.header("Upload ECG PDF for Simulated Analysis")
 uploaded_file = st.file_uploader("Upload a patient ECG PDF", type="pdf", disabled=st.session_state.is_streaming)
 
-if uploaded_file is not None:
-    st.session_state.uploaded_pdf = uploaded_file # Store uploaded file in session state
-    st.success(f"PDF uploaded successfully: {uploaded_file.name}")
-    st.info("Note: This app will simulate an AI diagnosis for the uploaded PDF. Actual ECG signal extraction and real AI analysis from a PDF is a complex task beyond the scope of this demo.")
-
+# The simulate buttons and the result card live in one fragment: pressing a
+# button reruns only this block, not the CSS, templates and page widgets
+@st.fragment
+def _pdf_result_fragment():
     st.subheader("Simulate AI Analysis for Uploaded PDF")
     col_pdf_normal, col_pdf_mi = st.columns(2)
 
@@ -253,19 +140,82 @@ if uploaded_file is not None:
             st.session_state.is_streaming = False # Ensure streaming stops if PDF analysis starts
             st.session_state.pdf_analysis_triggered = True
             st.session_state.ecg_type = 'normal' # Set type for simulated analysis
-            # st.experimental_rerun() # REMOVED: No longer needed here
 
     with col_pdf_mi:
         if st.button("Simulate MI Result for PDF", type="secondary", disabled=st.session_state.is_streaming, key="pdf_mi_btn"):
             st.session_state.is_streaming = False # Ensure streaming stops if PDF analysis starts
             st.session_state.pdf_analysis_triggered = True
-            # st.experimental_rerun() # REMOVED: No longer needed here
+            st.session_state.ecg_type = 'mi' # Set type for simulated analysis
+
+    # Display the simulated digitization and model inference (if triggered)
+    if st.session_state.pdf_analysis_triggered and st.session_state.ecg_type:
+        chart_placeholder.empty() # Clear any previous chart if PDF analysis is triggered
+        simulate_pdf_analysis_and_inference(st.session_state.ecg_type)
+        # Clear PDF analysis flag after displaying results (important for proper state management)
+        st.session_state.pdf_analysis_triggered = False
+
+if uploaded_file is not None:
+    st.session_state.uploaded_pdf = uploaded_file # Store uploaded file in session state
+    st.success(f"PDF uploaded successfully: {uploaded_file.name}")
+    st.info("Note: This app will simulate an AI diagnosis for the uploaded PDF. Actual ECG signal extraction and real AI analysis from a PDF is a complex task beyond the scope of this demo.")
+
+    _pdf_result_fragment()
 
     # Clear analysis results if a new PDF is uploaded or stream started
     if not st.session_state.is_streaming and not st.session_state.pdf_analysis_triggered:
         analysis_placeholder.empty()
 
 # --- Display Real-time ECG Stream (if active) ---
+
+# Streaming chart fragment: run_every reruns only this function at the tick
+# rate instead of blocking the script in a while loop and re-executing the
+# whole page on every interaction. Disabled (run_every=None) while idle.
+# The period is derived from the signal constants so the wall clock stays
+# phase-locked to the generated samples, and Streamlit's timer schedules
+# against a fixed deadline instead of sleeping after each tick's work,
+# absorbing per-tick compute jitter rather than accumulating it as drift.
+@st.fragment(
+    run_every=f"{CHUNK_SIZE * SAMPLE_MS}ms" if st.session_state.is_streaming else None
+)
+def _stream_fragment():
+    # Read session_state once per tick; each access goes through the
+    # attribute proxy with a lock and dict lookup
+    streaming = st.session_state.is_streaming
+    ecg_type = st.session_state.ecg_type
+    if not (streaming and ecg_type):
+        return
+    template = TEMPLATES[ecg_type]
+    step = st.session_state.stream_step
+    # Generate a whole chunk at once: one template slice + one vectorized noise draw
+    idx = np.arange(step, step + CHUNK_SIZE) % TEMPLATE_LEN
+    # One batched float32 draw per chunk; (0,1) shifted/scaled to the
+    # same +/-2.5 amplitude the scalar path uses
+    noise = (RNG.random(CHUNK_SIZE, dtype=np.float32) - 0.5) * 5
+    chunk = template[idx] + noise
+    # Write the chunk into the ring buffer in place: no list reallocation,
+    # no O(N) slice copy per tick
+    buf = st.session_state.stream_buf
+    pos = st.session_state.stream_pos
+    end = pos + CHUNK_SIZE
+    if end <= buf.size:
+        buf[pos:end] = chunk
+    else:
+        split = buf.size - pos
+        buf[pos:] = chunk[:split]
+        buf[:CHUNK_SIZE - split] = chunk[split:]
+    st.session_state.stream_pos = pos = end % buf.size
+    filled = min(buf.size, st.session_state.stream_filled + CHUNK_SIZE)
+    st.session_state.stream_filled = filled
+    st.session_state.stream_step = step + CHUNK_SIZE
+    # Unroll the ring into chronological order for display (one memcpy)
+    if filled < buf.size:
+        view = buf[:filled]
+    else:
+        view = np.concatenate((buf[pos:], buf[:pos]))
+    # Hand the array straight to the chart: no per-tick DataFrame, Index
+    # or pandas type inference on the hot path
+    st.line_chart({'ECG Signal': view})
+
 if st.session_state.is_streaming and st.session_state.ecg_type:
     # Perform AI analysis immediately when stream starts (only if not already triggered by PDF)
     if not st.session_state.pdf_analysis_triggered: # Only re-run analysis if it's a new stream
@@ -274,65 +224,19 @@ if st.session_state.is_streaming and st.session_state.ecg_type:
         # Display initial analysis results in the placeholder
         with analysis_placeholder.container():
             st.markdown(f"<h2 style='text-align: center; color: #4a5568;'>AI Analysis Result:</h2>", unsafe_allow_html=True)
-            diagnosis_style_color = '#065f46' if st.session_state.ecg_type == 'normal' else '#b91c1c'
-            bg_color = '#ecfdf5' if st.session_state.ecg_type == 'normal' else '#fef2f2'
-            st.markdown(f"""
-                <div style='background-color: {bg_color}; padding: 1.5rem; border-radius: 0.5rem; box-shadow: 0 1px 2px rgba(0, 0, 0, 0.05);'>
-                    <p style='text-align: left; font-size: 1.125rem; margin-bottom: 0.5rem;'>
-                        <span style='font-weight: 500;'>Diagnosis:</span>
-                        <span style='font-weight: 700; color: {diagnosis_style_color};'> {diagnosis}</span>
-                    </p>
-                    <p style='text-align: left; font-size: 1.125rem; margin-bottom: 1rem;'>
-                        <span style='font-weight: 500;'>Confidence Score:</span>
-                        <span style='font-weight: 700; color: #4a5568;'> {confidence_score}%</span>
-                    </p>
-                    <h3 style='font-size: 1.25rem; font-weight: 600; color: #4a5568; margin-bottom: 0.75rem;'>Typical ECG Characteristics:</h3>
-                    <ul style='list-style-type: disc; margin-left: 1.25rem; color: #4a5568;'>
-                        {"".join(f"<li>{char}</li>" for char in characteristics)}
-                    </ul>
-                    <p style='text-align: left; font-size: 0.875rem; color: #718096; margin-top: 1rem; font-style: italic;'>
-                        Note: This application provides a simulated real-time ECG stream and AI analysis for educational purposes only. It is not a medical device and should not be used for actual diagnosis.
-                    </p>
-                </div>
-            """, unsafe_allow_html=True)
-
-
-    # Initialize ECG data for charting
-    ecg_data_points = []
-    time_index = 0
-    max_ecg_points = 600 # Corresponds to canvas width for a 1:1 pixel mapping in React
-
-    # Loop to continuously update the chart
-    while st.session_state.is_streaming:
-        new_point_value = generate_ecg_point(time_index, st.session_state.ecg_type)
-        ecg_data_points.append(new_point_value)
-
-        # Keep only the latest data points for scrolling effect
-        if len(ecg_data_points) > max_ecg_points:
-            ecg_data_points = ecg_data_points[-max_ecg_points:]
-
-        # Create a pandas DataFrame for Streamlit chart
-        chart_df = pd.DataFrame({
-            'index': range(len(ecg_data_points)),
-            'ECG Signal': ecg_data_points
-        })
-
-        with chart_placeholder.container():
-            st.line_chart(chart_df.set_index('index'))
-
-        time_index += 5 # Simulate 5ms per point
-        time.sleep(0.005) # Control update speed (5ms sleep)
-
-        # If the user stops the stream mid-loop, break out
-        if not st.session_state.is_streaming:
-            break
-
-# --- Display PDF Analysis Results (if triggered) ---
-if st.session_state.pdf_analysis_triggered and st.session_state.ecg_type:
-    chart_placeholder.empty() # Clear any previous chart if PDF analysis is triggered
-
-    # Simulate digitization and model inference for the PDF
-    simulate_pdf_analysis_and_inference(st.session_state.ecg_type)
-
-    # Clear PDF analysis flag after displaying results (important for proper state management)
-    st.session_state.pdf_analysis_triggered = False
+            st.markdown(result_card_html(
+                st.session_state.ecg_type,
+                diagnosis,
+                confidence_score,
+                tuple(characteristics),
+                'Diagnosis:',
+                'Typical ECG Characteristics:',
+                'Note: This application provides a simulated real-time ECG stream and AI analysis for educational purposes only. It is not a medical device and should not be used for actual diagnosis.',
+            ), unsafe_allow_html=True)
+
+
+    # Render the streaming chart; the fragment reruns itself every tick while
+    # the rest of the script (CSS, headers, widget handlers) stays untouched
+    with chart_placeholder.container():
+        _stream_fragment()
+
@@ -0,0 +1,137 @@
+import streamlit as st
+import numpy as np
+import math
+
+# Optional C extension for Largest-Triangle-Three-Buckets downsampling
+try:
+    from lttbc import downsample as _lttb_downsample
+except ImportError:
+    _lttb_downsample = None
+
+# Module-level PCG64 generator: faster per draw than the legacy global
+# RandomState and free of its lock; seeded for reproducible noise
+RNG = np.random.default_rng(42)
+
+# Milliseconds of signal represented by one sample
+SAMPLE_MS = 5
+
+# Points generated per UI update (20 points x 5 ms = 100 ms of signal per tick)
+CHUNK_SIZE = 20
+
+# Approximate chart canvas width; more points than this carry no visual benefit
+PIXEL_WIDTH = 600
+
+# Downsample a series to the chart's pixel width with LTTB (shape-preserving),
+# so long buffers don't inflate the JSON payload sent to the browser.
+# Falls back to the full series when lttbc is not installed or not needed.
+def downsample_for_display(xs, ys, n_out=PIXEL_WIDTH):
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if _lttb_downsample is None or len(ys) <= n_out:
+        return xs, ys
+    return _lttb_downsample(xs, ys, n_out)
+
+TEMPLATE_LEN = 200
+
+# Build one full noise-free beat (1000 ms at 5 ms resolution = 200 samples) per
+# scenario as NumPy arrays. The streaming loop then just indexes into a template
+# instead of re-running the per-phase branching and trig for every single sample.
+# At 5 ms per sample the phase boundaries land on exact indices, so each segment
+# is pasted in with plain slice assignment; the two sine sub-ranges are computed
+# exactly once here and never again at runtime.
+def _build_templates():
+    # float32 throughout: the signal is visualization-only, fits the
+    # dynamic range easily and moves half the bytes of float64
+    y = np.zeros(TEMPLATE_LEN, dtype=np.float32)
+    # P wave, 0-100 ms (samples 0:20): a small positive hump
+    y[0:20] = np.sin(np.arange(20) / 20 * np.pi) * 10
+    # QRS complex: Q (down, 150-170 ms), R (large up, 170-200 ms),
+    # S (down, 200-250 ms) deflections, all piecewise linear
+    t_q = np.arange(150, 170, 5)
+    y[30:34] = (t_q - 170) / 20 * 30
+    t_r = np.arange(170, 200, 5)
+    y[34:40] = ((t_r - 170) / 30) * -80
+    t_s = np.arange(200, 250, 5)
+    y[40:50] = (t_s - 200) / 50 * 50
+    # T wave, 320-450 ms (samples 64:90): a broader hump after the ST segment
+    t_t = np.arange(320, 450, 5)
+    y[64:90] = np.sin((t_t - 320) / 130 * np.pi) * 20
+    # MI variant from the same segments: ST elevation (250-320 ms),
+    # pathological (deeper) Q wave and T wave inversion
+    y_mi = y.copy()
+    y_mi[50:64] -= 30
+    y_mi[30:34] += (t_q - 170) / 20 * 60
+    y_mi[64:90] *= -1.5
+    # Cached resources are shared between sessions, so freeze the arrays
+    # to rule out one session mutating what another one is reading
+    y.setflags(write=False)
+    y_mi.setflags(write=False)
+    return {'normal': y, 'mi': y_mi}
+
+# Share the (immutable) templates across every session and rerun of the
+# Streamlit server instead of rebuilding them per session
+@st.cache_resource
+def get_templates():
+    return _build_templates()
+
+# One-beat templates precomputed at import for both scenarios
+TEMPLATES = get_templates()
+
+# Scalar ECG sample kernel: pure math.sin + branches with the RNG kept outside,
+# so Numba can compile it to straight-line native code when available.
+def _gen(time_in_beat, is_mi, noise):
+    y = 0.0  # Baseline for the ECG signal
+
+    # Simulate P wave (at the beginning of the beat cycle)
+    if 0 <= time_in_beat < 100:
+        y += math.sin(time_in_beat / 100 * math.pi) * 10  # A small positive hump
+    # Simulate PR segment (flat line after P wave)
+    elif 100 <= time_in_beat < 150:
+        y += 0
+    # Simulate QRS complex (the main sharp spike)
+    elif 150 <= time_in_beat < 250:
+        if time_in_beat < 170:  # Q wave (downward deflection)
+            y += (time_in_beat - 170) / 20 * 30
+        elif time_in_beat < 200:  # R wave (large upward deflection)
+            y += ((time_in_beat - 170) / 30) * -80
+        else:  # S wave (downward deflection after R)
+            y += (time_in_beat - 200) / 50 * 50
+    # Simulate ST segment (flat line after S wave, before T wave)
+    elif 250 <= time_in_beat < 320:
+        y += 0
+    # Simulate T wave (a broader hump after ST segment)
+    elif 320 <= time_in_beat < 450:
+        y += math.sin((time_in_beat - 320) / 130 * math.pi) * 20
+
+    # Add random noise to make the signal less perfect
+    y += (noise - 0.5) * 5
+
+    # Apply Myocardial Infarction (MI) specific changes
+    if is_mi:
+        # Simulate ST elevation: A significant upward shift of the ST segment, characteristic of STEMI
+        if 250 <= time_in_beat < 320:
+            y -= 30  # Elevate ST segment by a fixed amount
+        # Simulate pathological Q wave: A deeper and wider Q wave, often indicating past MI
+        if 150 <= time_in_beat < 170:
+            y += (time_in_beat - 170) / 20 * 60  # Make Q wave significantly deeper
+        # Simulate T wave inversion: The T wave goes below the baseline, common in MI
+        if 320 <= time_in_beat < 450:
+            y *= -1.5  # Invert and amplify the T wave
+
+    return y
+
+# Compile the kernel when Numba is installed; cache=True avoids re-JITting per session
+try:
+    from numba import njit
+    _gen = njit(cache=True)(_gen)
+except ImportError:
+    pass
+
+# Utility function to generate a single ECG point (Y-value) at a given time for a specific type
+# This function simulates the different phases of an ECG waveform (P, QRS, T) and adds noise.
+# For MI, it introduces simulated ST elevation, deeper Q waves, and inverted T waves.
+def generate_ecg_point(time_ms, ecg_type):
+    # Simulate a heart rate of 60 bpm (1 beat per second)
+    beat_duration = 1000  # milliseconds for one complete ECG cycle
+    time_in_beat = time_ms % beat_duration  # Current time within the 1-second beat cycle
+    return _gen(time_in_beat, ecg_type == 'mi', RNG.random())
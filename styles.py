@@ -0,0 +1,84 @@
+import streamlit as st
+
+# Static page CSS built once per process and shared across sessions
+@st.cache_resource
+def page_css():
+    return """
+    <style>
+    .reportview-container {
+        background: #f0f2f6; /* Light gray background */
+    }
+    .main .block-container {
+        background-color: #ffffff; /* White card background */
+        padding: 2rem;
+        border-radius: 0.5rem;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1), 0 1px 3px rgba(0, 0, 0, 0.08);
+    }
+    h1 {
+        color: #1a56db; /* Blue for headings */
+        text-align: center;
+        font-family: 'Inter', sans-serif;
+        font-weight: 700;
+    }
+    p {
+        color: #4a5568; /* Darker gray for text */
+        text-align: center;
+        font-family: 'Inter', sans-serif;
+    }
+    .stButton>button {
+        background-color: #4CAF50; /* Green button */
+        color: white;
+        padding: 0.75rem 1.5rem;
+        border-radius: 0.5rem;
+        border: none;
+        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
+        transition: all 0.3s ease-in-out;
+        font-weight: 600;
+    }
+    .stButton>button:hover {
+        background-color: #45a049;
+        transform: scale(1.02);
+    }
+    /* Specific styles for MI button */
+    .stButton>button[kind="secondary"] {
+        background-color: #ef4444; /* Red button */
+    }
+    .stButton>button[kind="secondary"]:hover {
+        background-color: #dc2626;
+    }
+    /* Stop button */
+    .stButton>button[kind="tertiary"] {
+        background-color: #6b7280; /* Gray button */
+    }
+    .stButton>button[kind="tertiary"]:hover {
+        background-color: #4b5563;
+    }
+    </style>
+"""
+
+# Result-card HTML cached on its inputs, so a rerun with the same diagnosis
+# doesn't rebuild the same tens-of-kilobytes f-string again
+@st.cache_data
+def result_card_html(ecg_type, diagnosis, confidence_score, characteristics,
+                     diagnosis_label, chars_heading, note):
+    diagnosis_style_color = '#065f46' if ecg_type == 'normal' else '#b91c1c'
+    bg_color = '#ecfdf5' if ecg_type == 'normal' else '#fef2f2'
+    return f"""
+        <div style='background-color: {bg_color}; padding: 1.5rem; border-radius: 0.5rem; box-shadow: 0 1px 2px rgba(0, 0, 0, 0.05);'>
+            <p style='text-align: left; font-size: 1.125rem; margin-bottom: 0.5rem;'>
+                <span style='font-weight: 500;'>{diagnosis_label}</span>
+                <span style='font-weight: 700; color: {diagnosis_style_color};'> {diagnosis}</span>
+            </p>
+            <p style='text-align: left; font-size: 1.125rem; margin-bottom: 1rem;'>
+                <span style='font-weight: 500;'>Confidence Score:</span>
+                <span style='font-weight: 700; color: #4a5568;'> {confidence_score}%</span>
+            </p>
+            <h3 style='font-size: 1.25rem; font-weight: 600; color: #4a5568; margin-bottom: 0.75rem;'>{chars_heading}</h3>
+            <ul style='list-style-type: disc; margin-left: 1.25rem; color: #4a5568;'>
+                {"".join(f"<li>{char}</li>" for char in characteristics)}
+            </ul>
+            <p style='text-align: left; font-size: 0.875rem; color: #718096; margin-top: 1rem; font-style: italic;'>
+                {note}
+            </p>
+        </div>
+    """